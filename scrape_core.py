@@ -0,0 +1,323 @@
+# FILE: scrape_core.py
+import asyncio
+import os
+import httpx
+import orjson
+import re
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from selectolax.lexbor import LexborHTMLParser
+from tqdm import tqdm
+from urllib.parse import urljoin
+
+BASE_URL = "https://grilld.com.au"
+RESTAURANTS_LIST_URL = urljoin(BASE_URL, "/restaurants")
+_BASE = BASE_URL.rstrip('/')
+OUTPUT_FILE = "stores.json"
+CACHE_FILE = "stores.cache.json"
+# Bump whenever parse_store_page's output changes, so stores scraped by the old
+# parser are fetched and parsed again instead of being reused on a 304.
+CACHE_VERSION = 1
+DAY_RANK = {day: i for i, day in enumerate(["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"])}
+# The scrape is network-bound, so concurrency is cheap; override with SCRAPE_WORKERS
+# if the site starts rate-limiting.
+MAX_WORKERS = int(os.environ.get('SCRAPE_WORKERS', 32))
+HEADERS = {'Accept-Encoding': 'gzip, br, deflate'}
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 0.3
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_AFTER_MAX = 120
+
+# The two JSON blobs we need are sliced straight out of the raw page bytes.
+_LDJSON_RE = re.compile(rb'<script[^>]*\btype="application/ld\+json"[^>]*>(.*?)</script>', re.DOTALL)
+_NUXT_RE = re.compile(rb'<script[^>]*\bid="__NUXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL)
+# The __NUXT_DATA__ walk goes through state.restaurant.restaurant, so a payload
+# without this key is skipped before paying for the full parse.
+_NUXT_RESTAURANT_KEY = b'"restaurant"'
+
+# Selectors run against the single Lexbor tree parsed per page.
+_STORE_LINK_SELECTOR = ".c-body-rich-text a[href]"
+_LDJSON_SELECTOR = 'script[type="application/ld+json"]'
+_NUXT_SELECTOR = '#__NUXT_DATA__'
+_CHIPS_SELECTOR = '.restaurant-chips .chip-text'
+
+def make_client():
+    """
+    Builds the shared HTTP/2 client. Every store page is on the same origin, so
+    all requests are multiplexed as streams over a single TLS connection.
+    """
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=20,
+        headers=HEADERS,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=MAX_WORKERS, max_keepalive_connections=MAX_WORKERS),
+    )
+
+def retry_after_seconds(response):
+    """
+    Returns the delay requested by a Retry-After header (delta-seconds or an HTTP
+    date), capped at RETRY_AFTER_MAX, or None if the header is absent or malformed.
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        seconds = (when - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0), RETRY_AFTER_MAX)
+
+async def get_with_retry(client, url, **kwargs):
+    """
+    GETs a URL, retrying transport errors and transient statuses with exponential
+    backoff (RETRY_BACKOFF_FACTOR * 2**attempt) over the client's open connection,
+    so one blip doesn't drop a store from the run. A Retry-After header on a
+    retryable status takes precedence over the computed backoff.
+    """
+    for attempt in range(RETRY_TOTAL + 1):
+        delay = RETRY_BACKOFF_FACTOR * 2 ** attempt
+        try:
+            response = await client.get(url, **kwargs)
+        except httpx.TransportError:
+            if attempt == RETRY_TOTAL:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == RETRY_TOTAL:
+                return response
+            retry_after = retry_after_seconds(response)
+            if retry_after is not None:
+                delay = retry_after
+        await asyncio.sleep(delay)
+
+def load_cache():
+    """
+    Loads the per-URL ETag/Last-Modified validators from the previous run. A missing,
+    unreadable or out-of-date cache just means a full scrape.
+    """
+    try:
+        with open(CACHE_FILE, 'rb') as f:
+            cache = orjson.loads(f.read())
+    except (IOError, orjson.JSONDecodeError):
+        return {}
+    if not isinstance(cache, dict) or cache.get('version') != CACHE_VERSION:
+        return {}
+    return cache.get('validators', {})
+
+def save_cache(cache):
+    """Writes the validator cache back to disk for the next run."""
+    try:
+        with open(CACHE_FILE, 'wb') as f:
+            f.write(orjson.dumps({'version': CACHE_VERSION, 'validators': cache}, option=orjson.OPT_INDENT_2))
+    except IOError as e:
+        print(f"Error writing to file {CACHE_FILE}: {e}")
+
+def load_previous_stores():
+    """Loads the records from the last OUTPUT_FILE, keyed by URL, for reuse on a 304."""
+    try:
+        with open(OUTPUT_FILE, 'rb') as f:
+            stores = orjson.loads(f.read())
+    except (IOError, orjson.JSONDecodeError):
+        return {}
+    return {store['url']: store for store in stores if isinstance(store, dict) and store.get('url')}
+
+def format_hour(hhmm):
+    """Formats an ld+json "HH:MM" time as a 12-hour label such as "11AM" (minutes are dropped)."""
+    hour, minute = hhmm.split(':')
+    hour, minute = int(hour), int(minute)
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"Invalid time: {hhmm}")
+    return f"{hour % 12 or 12}{'AM' if hour < 12 else 'PM'}"
+
+def write_stores(stores):
+    """
+    Writes the store list to OUTPUT_FILE one record at a time, so only a single
+    serialized store is held in memory. Output matches a 2-space indented dump.
+    """
+    with open(OUTPUT_FILE, 'wb') as f:
+        if not stores:
+            f.write(b'[]')
+            return
+        f.write(b'[\n')
+        for i, store in enumerate(stores):
+            if i:
+                f.write(b',\n')
+            # Nest the record one level in; JSON strings never contain a raw newline.
+            f.write(b'  ' + orjson.dumps(store, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).replace(b'\n', b'\n  '))
+        f.write(b'\n]')
+
+def find_script_body(content, pattern, tree, selector):
+    """
+    Returns the body of a script tag, scanning the raw page bytes with a regex
+    and only falling back to a selector lookup on the parsed tree if it misses.
+    """
+    match = pattern.search(content)
+    if match:
+        return match.group(1)
+    script = tree.css_first(selector)
+    return script.text().encode() if script else None
+
+async def get_store_urls(client):
+    """Fetches the main restaurants page and extracts all individual store URLs."""
+    print(f"Fetching store list from {RESTAURANTS_LIST_URL}...")
+    try:
+        response = await get_with_retry(client, RESTAURANTS_LIST_URL)
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        print(f"Error fetching store list: {e}")
+        return []
+
+    tree = LexborHTMLParser(response.content)
+    
+    urls = set()
+    for link in tree.css(_STORE_LINK_SELECTOR):
+        href = link.attributes.get('href')
+        if href and 'restaurants/' in href:
+            # Site-relative links are the norm; only hand anything else to urljoin.
+            if href.startswith('/') and not href.startswith('//'):
+                full_url = _BASE + href
+            else:
+                full_url = urljoin(BASE_URL, href)
+            urls.add(full_url)
+                
+    if not urls:
+        print("Warning: No store URLs found. The page structure might have changed.")
+
+    print(f"Found {len(urls)} unique store URLs.")
+    return sorted(list(urls))
+
+def parse_store_page(content, url):
+    """
+    Extracts store data from a fetched page, primarily from the ld+json script tag,
+    supplemented with data from other parts of the page.
+
+    Runs in a worker process, so it has to stay a picklable top-level function.
+    Returns (data, messages): data is None on failure, and messages holds the
+    errors and warnings for the parent to print, since a child can't write around
+    the parent's progress bar.
+    """
+    messages = []
+    # Parsed once; the ld+json/NUXT fallbacks and the service chips all query this tree.
+    tree = LexborHTMLParser(content)
+
+    # --- 1. Primary Source: ld+json for core data (most reliable) ---
+    ld_json_body = find_script_body(content, _LDJSON_RE, tree, _LDJSON_SELECTOR)
+    if not ld_json_body:
+        messages.append(f"  -> Error: ld+json script tag not found on {url}")
+        return None, messages
+    try:
+        ld_data = orjson.loads(ld_json_body)
+    except orjson.JSONDecodeError:
+        messages.append(f"  -> Error: Failed to parse ld+json on {url}")
+        return None, messages
+
+    get = ld_data.get
+
+    # Combine address parts for a full address string
+    address_get = get('address', {}).get
+    address_parts = [
+        address_get('streetAddress'),
+        address_get('addressLocality'),
+        address_get('addressRegion')
+    ]
+    full_address = ', '.join(filter(None, [part.strip() if part else None for part in address_parts]))
+
+    # Reformat opening hours to match the desired structure
+    opening_hours = []
+    for spec in get('openingHoursSpecification', []):
+        try:
+            day = spec.get('dayOfWeek')
+            desc = f"{format_hour(spec['opens'])} - {format_hour(spec['closes'])}"
+            opening_hours.append({'name': day, 'description': desc, 'isClosed': False})
+        except (ValueError, TypeError, KeyError, AttributeError):
+            continue
+    # dayOfWeek may also be a list of days, which sorts last as it did before.
+    opening_hours.sort(key=lambda x: DAY_RANK.get(x['name'], 99) if isinstance(x['name'], str) else 99)
+
+    data = {
+        'name': get('name'),
+        'address': full_address,
+        'phone': get('telephone'),
+        'opening_hours': opening_hours,
+        'url': url,
+        'description': None, 'services': [], 'latitude': None, 'longitude': None # Placeholders
+    }
+
+    # --- 2. Scrape visible HTML for services ---
+    data['services'] = [chip.text().strip() for chip in tree.css(_CHIPS_SELECTOR)]
+
+    # --- 3. Scrape __NUXT_DATA__ for geo-coords and description (less reliable) ---
+    nuxt_data_body = find_script_body(content, _NUXT_RE, tree, _NUXT_SELECTOR)
+    if nuxt_data_body and _NUXT_RESTAURANT_KEY in nuxt_data_body:
+        try:
+            nuxt_data = orjson.loads(nuxt_data_body)
+            def dereference(data_list, ref):
+                if isinstance(ref, int) and 0 <= ref < len(data_list):
+                    return data_list[ref]
+                return None
+            
+            state_ref_obj = next((item for item in nuxt_data if isinstance(item, dict) and 'state' in item), None)
+            if state_ref_obj:
+                state_obj = dereference(nuxt_data, state_ref_obj.get('state'))
+                if isinstance(state_obj, dict):
+                    restaurant_ref = state_obj.get('restaurant', {}).get('restaurant')
+                    restaurant_obj = dereference(nuxt_data, restaurant_ref)
+                    if isinstance(restaurant_obj, dict):
+                        data['latitude'] = dereference(nuxt_data, restaurant_obj.get('latitude'))
+                        data['longitude'] = dereference(nuxt_data, restaurant_obj.get('longitude'))
+                        data['description'] = dereference(nuxt_data, restaurant_obj.get('description'))
+        except (orjson.JSONDecodeError, IndexError, TypeError) as e:
+            messages.append(f"  -> Warning: Could not parse __NUXT_DATA__ for extra details on {url}. Error: {e}")
+
+    return data, messages
+
+async def scrape_store_page(client, url, cache, previous, pool, request_slots):
+    """
+    Fetches a store page and hands the bytes to `pool` for parsing, so parsing
+    fans out across cores while the event loop keeps the other fetches moving.
+
+    `request_slots` is a semaphore capping in-flight requests. HTTP/2 multiplexes
+    streams over one connection, so the connection limit alone doesn't bound a burst.
+
+    The request is made conditional on the validators in `cache`; an unchanged page
+    comes back as a bodiless 304 and its record in `previous` is reused.
+    """
+    validators = cache.get(url) if url in previous else None
+    headers = {}
+    if validators:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+    try:
+        async with request_slots:
+            response = await get_with_retry(client, url, headers=headers)
+        if response.status_code == 304 and validators:
+            return previous[url]
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        tqdm.write(f"  -> Error fetching {url}: {e}")
+        return None
+
+    loop = asyncio.get_running_loop()
+    data, messages = await loop.run_in_executor(pool, parse_store_page, response.content, url)
+    for message in messages:
+        tqdm.write(message)
+    if not data:
+        return None
+
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if etag or last_modified:
+        cache[url] = {'etag': etag, 'last_modified': last_modified}
+    else:
+        cache.pop(url, None)
+
+    return data